@@ -1,16 +1,22 @@
-import functools
+import asyncio
+import concurrent.futures
 import logging
+import logging.handlers
+import queue
 import traceback
+import orjson
 import uvicorn
 import yaml
 from pathlib import Path
 from typing import List
 from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse, PlainTextResponse
+from fastapi.responses import ORJSONResponse, PlainTextResponse
+from fastapi.routing import APIRoute
+from pydantic import TypeAdapter
 from returns.pipeline import is_successful
 from models.state_model import StateModel
 from models.system_model import SystemModel, PartialSystemModel
-from utils.ansible.inventory import InventoryManager
+from utils.ansible.inventory import InventoryManager, _norm_mac
 from utils.repo import RepoManager
 from utils.ansible.hostvars import HostvarType, HostvarsManager
 from utils.dict_utils import ReplacementType
@@ -18,10 +24,24 @@ from models.inventory_model import *
 from models.storage_model import *
 from models.entry_model import *
 
-"""Logging configuration"""
-logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
+"""Logging configuration: handlers format off the request thread via a queue"""
+_log_queue = queue.SimpleQueue()
+_log_handler = logging.StreamHandler()
+_log_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+# force=True replaces any handler installed by an imported module so records
+# really do route through the queue instead of a pre-existing StreamHandler.
+logging.basicConfig(level=logging.DEBUG, handlers=[logging.handlers.QueueHandler(_log_queue)], force=True)
+_log_listener = logging.handlers.QueueListener(_log_queue, _log_handler)
+_log_listener.start()
 logger = logging.getLogger(__name__)
 
+"""Shared TypeAdapters so pydantic serializer lookup happens once per process"""
+_STATE_ADAPTER = TypeAdapter(StateModel)
+_STORAGE_ADAPTER = TypeAdapter(StorageModel)
+_PARTIAL_STORAGE_ADAPTER = TypeAdapter(PartialStorageModel)
+_SYSTEM_ADAPTER = TypeAdapter(SystemModel)
+_PARTIAL_SYSTEM_ADAPTER = TypeAdapter(PartialSystemModel)
+
 """Configuration for the application"""
 REPO_DIR: Path = Path("/app/repos")
 REPO_SSH: str = "git@github.com:asdf57/hostvar_data.git"
@@ -29,8 +49,25 @@ INVENTORY_REPO_SSH: str = "git@github.com:asdf57/inventory.git"
 HOSTVAR_REPO_PATH = REPO_DIR / "hostvar_data"
 INVENTORY_REPO_PATH = REPO_DIR / "inventory" / "inventory.yml"
 
+class ORJSONRequest(Request):
+    """Request whose json() decodes the body with orjson instead of stdlib json."""
+    async def json(self):
+        if not hasattr(self, "_json"):
+            self._json = orjson.loads(await self.body())
+        return self._json
+
+class ORJSONRoute(APIRoute):
+    def get_route_handler(self):
+        original_route_handler = super().get_route_handler()
+
+        async def orjson_route_handler(request: Request):
+            return await original_route_handler(ORJSONRequest(request.scope, request.receive))
+
+        return orjson_route_handler
+
 try:
-    app = FastAPI()
+    app = FastAPI(default_response_class=ORJSONResponse)
+    app.router.route_class = ORJSONRoute
 except Exception as e:
     logger.error(f"Failed to initialize app: {e}")
     exit(1)
@@ -45,176 +82,211 @@ except Exception as e:
     logger.error(f"Failed to initialize global variables: {e}")
     exit(1)
 
-def handle_exceptions(func):
-    @functools.wraps(func)
-    async def wrapper(*args, **kwargs):
-        try:
-            return await func(*args, **kwargs)
-        except Exception as e:
-            tb = traceback.format_exc()
-            logger.error(f"Exception occurred: {tb}")
-            return JSONResponse(content={"status": "error", "message": str(e), "traceback": tb}, status_code=500)
-    return wrapper
+"""Dedicated executor for blocking git/YAML work, sized to bound git concurrency"""
+_GIT_POOL = concurrent.futures.ThreadPoolExecutor(max_workers=4, thread_name_prefix="git")
+
+async def _run_blocking(func, *args):
+    return await asyncio.get_running_loop().run_in_executor(_GIT_POOL, func, *args)
+
+"""Interval (seconds) at which deferred git commits are coalesced and pushed"""
+COMMIT_FLUSH_INTERVAL = 0.5
+
+async def _commit_worker():
+    """Periodically flush deferred commits so each flush is one commit+push."""
+    while True:
+        await asyncio.sleep(COMMIT_FLUSH_INTERVAL)
+        for repo in (inventory_repo, hostvar_data_repo):
+            await _run_blocking(repo.flush)
+
+"""Reference to the commit-worker task so it is never garbage-collected"""
+_commit_task = None
+
+@app.on_event("startup")
+async def start_commit_worker():
+    global _commit_task
+    inventory_repo.defer_push = True
+    hostvar_data_repo.defer_push = True
+    _commit_task = asyncio.create_task(_commit_worker())
+
+@app.exception_handler(Exception)
+async def handle_unhandled_exception(request: Request, exc: Exception):
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.error("Exception occurred: %s", traceback.format_exc())
+    else:
+        logger.error("Exception occurred: %s", exc)
+    return ORJSONResponse({"status": "error", "message": str(exc)}, status_code=500)
+
+"""Lazy MAC -> OS lookup for the boot-critical iPXE path; cleared on mutation"""
+_mac_to_os: dict[str, str] = {}
+
+def _rebuild_mac_to_os() -> None:
+    """Repopulate the MAC cache in one pass over inventory and system sections."""
+    inventory = inventory_manager.load()
+    systems = hostvars_manager.get_all_by_section(HostvarType.SYSTEM)
+    mapping = {}
+    for host in inventory.inventory.get_hosts():
+        mac = host.vars.get("primary_mac")
+        os_name = systems.get(host.name, {}).get("os")
+        if mac and os_name:
+            mapping[_norm_mac(str(mac))] = str(os_name)
+    _mac_to_os.clear()
+    _mac_to_os.update(mapping)
 
 async def update_hostvars(host, data, hostvar_type: HostvarType, replace_type: ReplacementType):
-    hostvars_manager.update(host, hostvar_type, replace_type, data)
-    return JSONResponse(content={"status": "success", "message": "Hostvars updated"}, status_code=200)
+    await _run_blocking(hostvars_manager.update, host, hostvar_type, replace_type, data)
+    # Invalidate after the mutation lands: clearing before the await lets a
+    # concurrent /ipxe miss rebuild from pre-mutation data and stay stale.
+    _mac_to_os.clear()
+    return {"status": "success", "message": "Hostvars updated"}
 
 async def init_host(payload: EntryModel):
     inventory = payload.inventory
     storage = payload.storage
 
-    inventory_manager.add_host(inventory.host, [inventory.node_type] + inventory.groups, inventory.family, str(inventory.ip), inventory.mac, inventory.port, inventory.ansible_user)
-    hostvars_manager.create(inventory.host, storage)
+    await _run_blocking(inventory_manager.add_host, inventory.host, [inventory.node_type] + inventory.groups, inventory.family, str(inventory.ip), inventory.mac, inventory.port, inventory.ansible_user)
+    await _run_blocking(hostvars_manager.create, inventory.host, storage)
 
-    return JSONResponse(content={"status": "success", "message": "Host initialized"}, status_code=200)
+    return {"status": "success", "message": "Host initialized"}
 
 @app.post("/hostvars/{host}")
-@handle_exceptions
 async def post_hostvars(host: str, data: dict):
     return await update_hostvars(host, data, HostvarType.ANY, ReplacementType.OVERRIDE)
 
 @app.put("/hostvars/{host}")
-@handle_exceptions
-async def post_hostvars(host: str, data: dict):
+async def put_hostvars(host: str, data: dict):
     return await update_hostvars(host, data, HostvarType.ANY, ReplacementType.IN_PLACE)
 
 
 @app.get("/hostvars/{host}")
-@handle_exceptions
 async def get_hostvars(host: str):
-    hostvars_data = hostvars_manager.get(host)
-    return JSONResponse(content={"status": "success", "data": hostvars_data}, status_code=200)
+    hostvars_data = await _run_blocking(hostvars_manager.get, host)
+    return {"status": "success", "data": hostvars_data}
 
 @app.get("/hostvars")
-@handle_exceptions
-async def get_hostvars():
-    hostvars_data = hostvars_manager.get_all()
-    return JSONResponse(content={"status": "success", "data": hostvars_data}, status_code=200)
+async def get_all_hostvars():
+    hostvars_data = await _run_blocking(hostvars_manager.get_all)
+    return {"status": "success", "data": hostvars_data}
 
 @app.post("/state/{host}")
-@handle_exceptions
 async def post_state(host: str, payload: StateModel):
-    logger.info(f"payload: {payload.model_dump()}")
-    return await update_hostvars(host, payload.model_dump(), HostvarType.STATE, ReplacementType.OVERRIDE)
+    if logger.isEnabledFor(logging.INFO):
+        logger.info("payload: %s", payload.model_dump_json())
+    return await update_hostvars(host, _STATE_ADAPTER.dump_python(payload), HostvarType.STATE, ReplacementType.OVERRIDE)
 
 @app.put("/state/{host}")
-@handle_exceptions
-async def post_state(host: str, payload: StateModel):
-    logger.info(f"payload: {payload.model_dump()}")
-    return await update_hostvars(host, payload.model_dump(), HostvarType.STATE, ReplacementType.IN_PLACE)
+async def put_state(host: str, payload: StateModel):
+    if logger.isEnabledFor(logging.INFO):
+        logger.info("payload: %s", payload.model_dump_json())
+    return await update_hostvars(host, _STATE_ADAPTER.dump_python(payload, exclude_unset=True), HostvarType.STATE, ReplacementType.IN_PLACE)
 
 @app.get("/state/{host}")
-@handle_exceptions
 async def get_state(host: str):
-    state_data = hostvars_manager.get_section_by_host(host, HostvarType.STATE)
-    return JSONResponse(content={"status": "success", "data": state_data}, status_code=200)
+    state_data = await _run_blocking(hostvars_manager.get_section_by_host, host, HostvarType.STATE)
+    return {"status": "success", "data": state_data}
 
 @app.get("/state")
-@handle_exceptions
-async def get_state():
-    state_data = hostvars_manager.get_all_by_section(HostvarType.STATE)
-    return JSONResponse(content={"status": "success", "data": state_data}, status_code=200)
+async def get_all_state():
+    state_data = await _run_blocking(hostvars_manager.get_all_by_section, HostvarType.STATE)
+    return {"status": "success", "data": state_data}
 
 @app.post("/inventory")
-@handle_exceptions
 async def post_inventory(payload: InventoryModel):
     groups = [payload.node_type] + payload.groups
-    inventory_manager.add_host(payload.host, groups, payload.family, str(payload.ip), payload.mac, payload.port, payload.ansible_user)
-    return JSONResponse(content={"status": "success", "message": "Updated inventory"}, status_code=200)
+    await _run_blocking(inventory_manager.add_host, payload.host, groups, payload.family, str(payload.ip), payload.mac, payload.port, payload.ansible_user)
+    _mac_to_os.clear()
+    return {"status": "success", "message": "Updated inventory"}
 
 @app.delete("/inventory")
-@handle_exceptions
 async def delete_inventory(payload: List[DeleteInventoryModel]):
     for entry in payload:
-        logger.info(f"Removing host: {entry.host}")
-        inventory_manager.remove_host(entry.host)
-        logger.info(f"Deleting hosts: {entry.host}")
+        logger.info("Removing host: %s", entry.host)
+        await _run_blocking(inventory_manager.remove_host, entry.host)
+        logger.info("Deleting hosts: %s", entry.host)
+
+    _mac_to_os.clear()
+    return {"status": "success", "message": "Updated inventory"}
 
-    return JSONResponse(content={"status": "success", "message": "Updated inventory"}, status_code=200)
+@app.get("/inventory/sync")
+async def sync_pending_commits():
+    """Fence for callers/tests that need all deferred commits pushed."""
+    for repo in (inventory_repo, hostvar_data_repo):
+        await _run_blocking(repo.flush)
+    return {"status": "success", "message": "Pending commits flushed"}
 
 @app.get("/inventory")
-@handle_exceptions
 async def get_inventory():
-    inventory_data = inventory_manager.load().to_dict()
-    return JSONResponse(content={"status": "success", "data": inventory_data}, status_code=200)
+    inventory_data = await _run_blocking(inventory_manager.load_raw)
+    return {"status": "success", "data": inventory_data}
 
 @app.post("/storage/{host}")
-@handle_exceptions
 async def post_storage(host: str, payload: StorageModel):
-    return await update_hostvars(host, payload.model_dump(), HostvarType.STORAGE, ReplacementType.OVERRIDE)
+    return await update_hostvars(host, _STORAGE_ADAPTER.dump_python(payload), HostvarType.STORAGE, ReplacementType.OVERRIDE)
 
 @app.put("/storage/{host}")
-@handle_exceptions
 async def put_storage(host: str, payload: PartialStorageModel):
-    return await update_hostvars(host, payload.model_dump(exclude_none=True), HostvarType.STORAGE, ReplacementType.IN_PLACE)
+    return await update_hostvars(host, _PARTIAL_STORAGE_ADAPTER.dump_python(payload, exclude_none=True, exclude_unset=True), HostvarType.STORAGE, ReplacementType.IN_PLACE)
 
 @app.get("/storage/{host}")
-@handle_exceptions
 async def get_storage(host: str):
-    storage_data = hostvars_manager.get_section_by_host(host, HostvarType.STORAGE)
-    return JSONResponse(content={"status": "success", "data": storage_data}, status_code=200)
+    storage_data = await _run_blocking(hostvars_manager.get_section_by_host, host, HostvarType.STORAGE)
+    return {"status": "success", "data": storage_data}
 
 @app.get("/storage")
-@handle_exceptions
-async def get_storage():
-    storage_data = hostvars_manager.get_all_by_section(HostvarType.STORAGE)
-    return JSONResponse(content={"status": "success", "data": storage_data}, status_code=200)
+async def get_all_storage():
+    storage_data = await _run_blocking(hostvars_manager.get_all_by_section, HostvarType.STORAGE)
+    return {"status": "success", "data": storage_data}
 
 @app.post("/system/{host}")
-@handle_exceptions
 async def post_system(host: str, payload: SystemModel):
-    return await update_hostvars(host, payload.model_dump(), HostvarType.SYSTEM, ReplacementType.OVERRIDE)
+    return await update_hostvars(host, _SYSTEM_ADAPTER.dump_python(payload), HostvarType.SYSTEM, ReplacementType.OVERRIDE)
 
 @app.put("/system/{host}")
-@handle_exceptions
 async def put_system(host: str, payload: PartialSystemModel):
-    return await update_hostvars(host, payload.model_dump(exclude_none=True), HostvarType.SYSTEM, ReplacementType.IN_PLACE)
+    return await update_hostvars(host, _PARTIAL_SYSTEM_ADAPTER.dump_python(payload, exclude_none=True, exclude_unset=True), HostvarType.SYSTEM, ReplacementType.IN_PLACE)
 
 @app.get("/system/{host}")
-@handle_exceptions
 async def get_system(host: str):
-    data = hostvars_manager.get_section_by_host(host, HostvarType.SYSTEM)
-    return JSONResponse(content={"status": "success", "data": data}, status_code=200)
+    data = await _run_blocking(hostvars_manager.get_section_by_host, host, HostvarType.SYSTEM)
+    return {"status": "success", "data": data}
 
 @app.get("/system")
-@handle_exceptions
-async def get_system():
-    storage_data = hostvars_manager.get_all_by_section(HostvarType.SYSTEM)
-    return JSONResponse(content={"status": "success", "data": storage_data}, status_code=200)
+async def get_all_system():
+    storage_data = await _run_blocking(hostvars_manager.get_all_by_section, HostvarType.SYSTEM)
+    return {"status": "success", "data": storage_data}
 
 @app.post("/entry")
-@handle_exceptions
 async def post_init(payload: EntryModel):
     inventory = payload.inventory
     storage = payload.storage
     system  = payload.system
-    inventory_manager.add_host(inventory.host, [inventory.node_type] + inventory.groups, inventory.family, str(inventory.ip), inventory.mac, inventory.port, inventory.ansible_user)
-    hostvars_manager.create(inventory.host, storage, system)
-    return JSONResponse(content={"status": "success", "message": "Host initialized"}, status_code=200)
+    await _run_blocking(inventory_manager.add_host, inventory.host, [inventory.node_type] + inventory.groups, inventory.family, str(inventory.ip), inventory.mac, inventory.port, inventory.ansible_user)
+    await _run_blocking(hostvars_manager.create, inventory.host, storage, system)
+    _mac_to_os.clear()
+    return {"status": "success", "message": "Host initialized"}
 
 @app.delete("/entry/{host}")
-@handle_exceptions
 async def delete_entry(host: str):
-    inventory_manager.remove_host(host)
-    hostvars_manager.delete(host)
-    return JSONResponse(content={"status": "success", "message": "Host removed"}, status_code=200)
+    await _run_blocking(inventory_manager.remove_host, host)
+    await _run_blocking(hostvars_manager.delete, host)
+    _mac_to_os.clear()
+    return {"status": "success", "message": "Host removed"}
 
 @app.get("/ipxe/{mac}")
-@handle_exceptions
 async def get_ipxe_script(mac: str):
     """
     Returns a plaintext response of the os to iPXE boot to
     """
-    host = inventory_manager.get_host_by_mac(mac)
-    if not host:
+    os_name = _mac_to_os.get(_norm_mac(mac))
+    if os_name is None:
+        await _run_blocking(_rebuild_mac_to_os)
+        os_name = _mac_to_os.get(_norm_mac(mac))
+    if os_name is None:
         return PlainTextResponse(content="Host not found", status_code=404)
-    hostvars = hostvars_manager.get(host.name)
-    if not hostvars:
-        return PlainTextResponse(content="Hostvars not found", status_code=404)
 
-    return PlainTextResponse(content=str(hostvars['system']['os']), status_code=200)
+    return PlainTextResponse(content=os_name, status_code=200)
 
 # App Initialization
 if __name__ == '__main__':
-    uvicorn.run(app, host="0.0.0.0", port=3000)
+    # Single worker: the MAC cache, dirty flags, and deferred-commit queue are
+    # per-process, and the git worktree cannot take concurrent index writers.
+    uvicorn.run("main:app", host="0.0.0.0", port=3000, loop="uvloop", http="httptools")
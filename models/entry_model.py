@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field, IPvAnyAddress
+from pydantic import BaseModel, ConfigDict, Field, IPvAnyAddress
 from typing import Literal
 
 from models.inventory_model import *
@@ -6,6 +6,8 @@ from models.storage_model import *
 from models.system_model import SystemModel
 
 class EntryModel(BaseModel):
+    model_config = ConfigDict(frozen=True, extra="forbid")
+
     inventory: InventoryModel
     storage: StorageModel
     system: SystemModel
@@ -1,10 +1,12 @@
-from pydantic import BaseModel, Field, IPvAnyAddress
+from pydantic import BaseModel, ConfigDict, Field, IPvAnyAddress
 from typing import Literal
 from models.state_model import *
 from models.storage_model import *
 from models.system_model import SystemModel
 
 class HostvarsModel(BaseModel):
+    model_config = ConfigDict(frozen=True, extra="forbid")
+
     system: SystemModel
     state: StateModel
     storage: StorageModel
@@ -1,8 +1,10 @@
-from pydantic import BaseModel, Field, IPvAnyAddress
+from pydantic import BaseModel, ConfigDict, Field, IPvAnyAddress
 from typing import Literal
 
 
 class InventoryModel(BaseModel):
+    model_config = ConfigDict(frozen=True, extra="forbid")
+
     host: str
     ip: IPvAnyAddress
     mac: str
@@ -14,4 +16,6 @@ class InventoryModel(BaseModel):
     ansible_user: str = "root"
 
 class DeleteInventoryModel(BaseModel):
+    model_config = ConfigDict(frozen=True, extra="forbid")
+
     host: str
@@ -1,13 +1,28 @@
-from typing import Any
-from pydantic import BaseModel
+from functools import lru_cache
+from typing import Optional
+from pydantic import BaseModel, ConfigDict, create_model
 
 
-class OptionalModel(BaseModel):
-    @classmethod
-    def __pydantic_init_subclass__(cls, **kwargs: Any) -> None:
-        super().__pydantic_init_subclass__(**kwargs)
+class _PartialBase(BaseModel):
+    model_config = ConfigDict(extra="forbid", validate_assignment=False)
 
-        for field in cls.model_fields.values():
-            field.default = None
 
-        cls.model_rebuild(force=True)
+@lru_cache(maxsize=1024)
+def _opt(annotation):
+    """Memoized Optional[...]; building a typing.Union is not free."""
+    return Optional[annotation]
+
+
+@lru_cache(maxsize=None)
+def make_partial(model: type[BaseModel]) -> type[BaseModel]:
+    """
+    Build a variant of `model` whose fields are all optional and default to None.
+    Unlike mutating field defaults and forcing a rebuild per subclass, this does
+    exactly one core-schema build and leaves the parent model's fields untouched.
+    The result is cached per model class, so repeated calls are dict lookups.
+    """
+    fields = {
+        name: (_opt(field.annotation), None)
+        for name, field in model.model_fields.items()
+    }
+    return create_model(f"Partial{model.__name__}", __base__=(model, _PartialBase), **fields)
@@ -4,4 +4,6 @@ from functools import partial
 
 
 class StateModel(BaseModel):
+    model_config = ConfigDict(frozen=True, extra="forbid")
+
     is_provisioned: bool = False
@@ -1,13 +1,13 @@
-from pydantic import BaseModel, Field, field_validator, model_validator
+from pydantic import BaseModel, ConfigDict, Field, field_validator, model_validator
 from typing_extensions import Annotated
 from typing import List, Literal, Optional, Union
-from models.optional_model import OptionalModel
+from models.optional_model import make_partial
 
 VALID_PARTITION_TYPE = Literal["primary", "logical", "extended"]
 VALID_FS_TYPES = Literal[
-    "ext4", "ext3", "ext2", "xfs", "btrfs", "fat32", 
+    "ext4", "ext3", "ext2", "xfs", "btrfs", "fat32",
     "ntfs", "swap", "zfs", "jfs", "reiserfs", "f2fs",
-    "swap", "efi"
+    "efi"
 ]
 VALID_FLAGS = Literal["boot", "esp", "swap", "raid", "lvm", "noauto", "hidden"]
 
@@ -16,6 +16,8 @@ VALID_ALLOCATORS = Literal[
 ]
 
 class PartitionModel(BaseModel):
+    model_config = ConfigDict(frozen=True, extra="forbid")
+
     partition_type: VALID_PARTITION_TYPE = Field(
         description="Type of partition (primary, logical, or extended)"
     )
@@ -59,6 +61,8 @@ class PartitionModel(BaseModel):
         return v
 
 class StorageModel(BaseModel):
+    model_config = ConfigDict(frozen=True, extra="forbid")
+
     disk_name: str
     partitions: List[PartitionModel] = Field(
         default_factory=list,
@@ -75,11 +79,9 @@ class StorageModel(BaseModel):
         for partition in self.partitions:
             if partition.alloc_type == "percentage":
                 percentage_sum += partition.size
-
-        if percentage_sum > 100:
-            raise ValueError(f"Total percentage of partition(s) exceeds 100%: {percentage_sum}")
+                if percentage_sum > 100:
+                    raise ValueError(f"Total percentage of partition(s) exceeds 100%: {percentage_sum}")
 
         return self
 
-class PartialStorageModel(StorageModel, OptionalModel):
-    pass
\ No newline at end of file
+PartialStorageModel = make_partial(StorageModel)
\ No newline at end of file
@@ -2,11 +2,12 @@ from pydantic import BaseModel, IPvAnyAddress, ConfigDict
 from typing import Literal, Annotated
 from functools import partial
 
-from models.optional_model import OptionalModel
+from models.optional_model import make_partial
 
 
 class SystemModel(BaseModel):
+    model_config = ConfigDict(frozen=True, extra="forbid")
+
     os: Literal["arch", "debian"]
 
-class PartialSystemModel(SystemModel, OptionalModel):
-    pass
+PartialSystemModel = make_partial(SystemModel)
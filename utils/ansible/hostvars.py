@@ -1,54 +1,84 @@
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+import copy
+import os
+import time
+import zlib
+import orjson
 import yaml
 import logging
+
 from models.state_model import StateModel
 from models.storage_model import StorageModel
 from models.system_model import SystemModel
 from utils.ansible.manager import AnsibleManager, AnsibleObject
 from utils.repo import RepoManager
 from utils.dict_utils import ReplacementType, deep_merge
+from utils.file_utils import atomic_write
+from utils.parser_cache import parser_cache
+from utils.yaml_compat import SafeDumper
 from enum import Enum
 
-# Setup basic logging
-logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+"""
+On-disk format for per-host files. JSON (via orjson) is the default since the
+files are only consumed by this service; set HOSTVARS_FMT=yaml for repos that
+must stay hand-editable. Legacy .yml files are always readable.
+"""
+SERIALIZER = os.environ.get("HOSTVARS_FMT", "json")
+
 class HostvarType(Enum):
     STATE = "state"
     STORAGE = "storage"
     SYSTEM = "system"
     ANY = "any"
 
+"""Shared read-only sentinel so missing sections don't allocate a dict per host"""
+_EMPTY: dict = {}
+
+"""Shared pool for parallel host-file parsing; reused across load() calls"""
+_PARSE_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix="hostvars-parse")
+
 class Hostvars(AnsibleObject):
     """Handles in-memory hostvars data."""
     def __init__(self, data: dict = None):
         self.data = data or {}
+        self._dirty: set[str] = set()
 
     def update(self, host: str, var_type: HostvarType, replace_type: ReplacementType,  new_data: dict) -> None:
         """Update hostvars for a given host and section."""
 
-        host_data = self.data.setdefault(host, {})
+        logger.info("Passed params: host=%s, var_type=%s, new_data=%s", host, var_type, new_data)
 
-        logger.info(f"Passed params: host={host}, var_type={var_type}, new_data={new_data}")
+        if replace_type is ReplacementType.OVERRIDE and var_type is HostvarType.ANY:
+            self.data[host] = new_data
+            self._dirty.add(host)
+            return
 
-        if replace_type == ReplacementType.OVERRIDE:
-            if var_type == HostvarType.ANY:
-                self.data[host] = new_data
-            else:
-                host_data[var_type.value] = new_data
+        host_data = self.data.setdefault(host, {})
 
-        elif replace_type == ReplacementType.IN_PLACE:
-            if var_type == HostvarType.ANY:
+        if replace_type is ReplacementType.OVERRIDE:
+            host_data[var_type.value] = new_data
+
+        elif replace_type is ReplacementType.IN_PLACE:
+            if var_type is HostvarType.ANY:
                 host_data.update(deep_merge(host_data, new_data))
             else:
-                logger.info(f"Host data: {host_data}")
-                host_data[var_type.value] = deep_merge(host_data.get(var_type.value, {}), new_data)
-                logger.info(f"Updated host data: {host_data}")
+                logger.info("Host data: %s", host_data)
+                current = host_data.get(var_type.value)
+                if current is None:
+                    host_data[var_type.value] = new_data
+                else:
+                    host_data[var_type.value] = deep_merge(current, new_data)
+                logger.info("Updated host data: %s", host_data)
+
+        self._dirty.add(host)
 
     def get(self, host: str) -> dict:
         """Return hostvars for a specific host."""
-        return self.data.get(host, {})
+        return self.data.get(host, _EMPTY)
 
     def get_all(self) -> dict:
         """Return all hostvars data."""
@@ -56,17 +86,27 @@ class Hostvars(AnsibleObject):
     
     def get_section_by_host(self, host: str, section: HostvarType) -> dict:
         """Return a specific section of hostvars for a given host."""
-        if section == HostvarType.ANY:
+        if section is HostvarType.ANY:
             return self.get(host)
 
-        return self.data.get(host, {}).get(section.value, {})
+        return self.data.get(host, _EMPTY).get(section.value, _EMPTY)
 
     def get_all_by_section(self, section: HostvarType) -> dict:
         """Return a specific section of hostvars for all hosts."""
-        if section == HostvarType.ANY:
+        if section is HostvarType.ANY:
             return self.get_all()
 
-        return {host: data.get(section.value, {}) for host, data in self.get_all().items()}
+        return {host: data.get(section.value, _EMPTY) for host, data in self.get_all().items()}
+
+    def iter_all_by_section(self, section: HostvarType):
+        """Yield (host, section_data) pairs without building an intermediate dict."""
+        if section is HostvarType.ANY:
+            yield from self.data.items()
+            return
+
+        key = section.value
+        for host, data in self.data.items():
+            yield host, data.get(key, _EMPTY)
 
 
 class HostvarsManager(AnsibleManager):
@@ -74,66 +114,212 @@ class HostvarsManager(AnsibleManager):
     Manages hostvars stored as YAML files in a repository.
     Instead of caching the hostvars on initialization, we reload them for every operation.
     """
-    def __init__(self, repo: RepoManager):
+    def __init__(self, repo: RepoManager, pull_interval: float = 5.0):
         self.repo = repo
+        self.pull_interval = pull_interval
+        self._last_pull = 0.0
+        self._content_hash: dict[str, int] = {}
+
+    def load(self, force_pull: bool = False) -> Hostvars:
+        """
+        Load all YAML files as hostvars. The git pull is throttled to once per
+        pull_interval (mutation paths force it), and unchanged files come out
+        of the mtime-keyed parser cache instead of being re-parsed.
+        """
+        now = time.monotonic()
+        if force_pull or now - self._last_pull >= self.pull_interval:
+            self.repo.pull()
+            self._last_pull = now
+
+        json_entries = []
+        yml_entries = []
+        with os.scandir(self.repo.repo_path) as it:
+            for entry in it:
+                if not entry.is_file():
+                    continue
+                if entry.name.endswith(".json"):
+                    json_entries.append(entry)
+                elif entry.name.endswith(".yml"):
+                    yml_entries.append(entry)
+
+        files = []
+        seen = set()
+        for entry in json_entries + yml_entries:
+            host = entry.name.rsplit(".", 1)[0]
+            if host in seen:
+                continue
+            seen.add(host)
+            files.append((host, Path(entry.path)))
 
-    def load(self) -> Hostvars:
-        """Pull the latest repo data and load all YAML files as hostvars."""
-        self.repo.pull()
         hostvars_data = {}
-        for hostvar_file in self.repo.repo_path.glob("*.yml"):
-            host = hostvar_file.stem
-            try:
-                with open(hostvar_file, "r") as f:
-                    hostvars_data[host] = yaml.safe_load(f) or {}
-            except yaml.YAMLError as e:
-                logger.error(f"Error loading {hostvar_file}: {e}")
-                hostvars_data[host] = {}
+        if files:
+            for host, data in _PARSE_POOL.map(self._parse_one, files):
+                hostvars_data[host] = data
         logger.debug("Refreshed hostvars from repo.")
         return Hostvars(hostvars_data)
 
+    @staticmethod
+    def _parse_one(item: tuple) -> tuple:
+        """Parse a single (host, path) pair; orjson/libyaml release the GIL."""
+        host, hostvar_file = item
+        try:
+            return host, parser_cache.load(hostvar_file)
+        except (yaml.YAMLError, orjson.JSONDecodeError) as e:
+            logger.error(f"Error loading {hostvar_file}: {e}")
+            return host, {}
+
     def save(self, hostvars: Hostvars, commit_msg:str = "Update hostvars", batch_updates: bool = False) -> None:
         """
-        Save all hostvars back to the repository and push changes.
-        This method writes the updated data back to disk and commits it.
+        Save modified hostvars back to the repository and push changes.
+        Only hosts touched since the Hostvars object was loaded are rewritten.
         """
-        for host, data in hostvars.get_all().items():
-            hostvar_file = self.repo.repo_path / f"{host}.yml"
+        with self.repo.lock:
+            self._save_locked(hostvars, commit_msg, batch_updates)
+
+    def _save_locked(self, hostvars: Hostvars, commit_msg: str, batch_updates: bool) -> None:
+        for host in hostvars._dirty:
+            data = hostvars.data[host]
+            hostvar_file = self._host_file(host)
             try:
-                with open(hostvar_file, "w") as f:
-                    yaml.safe_dump(data, f)
+                payload = self._dump_bytes(data)
+                digest = zlib.crc32(payload)
+                if self._content_hash.get(host) == digest and hostvar_file.exists():
+                    logger.debug(f"Hostvars for '{host}' unchanged; skipping write.")
+                    continue
+                atomic_write(hostvar_file, payload)
+                self._content_hash[host] = digest
+                parser_cache.invalidate(hostvar_file)
+                self._remove_legacy_file(host, hostvar_file)
+                self.repo.mark_dirty()
                 logger.debug(f"Saved hostvars for host '{host}' to {hostvar_file}.")
             except Exception as e:
                 logger.error(f"Error saving {hostvar_file}: {e}")
                 raise
 
+        hostvars._dirty.clear()
+        self._sync_repo_dir()
+
         if batch_updates:
             return
 
         self.repo.commit_and_push_all(commit_msg)
         logger.debug("Committed and pushed all hostvars changes.")
 
+    def _host_file(self, host: str) -> Path:
+        """Path a host's file is written to under the configured serializer."""
+        ext = "yml" if SERIALIZER == "yaml" else "json"
+        return self.repo.repo_path / f"{host}.{ext}"
+
+    def _find_host_file(self, host: str) -> Path:
+        """Existing file for a host, preferring JSON over legacy YAML."""
+        for ext in ("json", "yml"):
+            candidate = self.repo.repo_path / f"{host}.{ext}"
+            if candidate.exists():
+                return candidate
+        return None
+
+    @staticmethod
+    def _dump_bytes(data: dict) -> bytes:
+        if SERIALIZER == "yaml":
+            return yaml.dump(data, Dumper=SafeDumper).encode()
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS)
+
+    def _remove_legacy_file(self, host: str, written_file: Path) -> Path:
+        """
+        Drop the stale YAML twin once a host has been rewritten as JSON.
+        Returns the removed path so callers can stage the deletion, or None.
+        """
+        if written_file.suffix != ".json":
+            return None
+        legacy_file = self.repo.repo_path / f"{host}.yml"
+        if legacy_file.exists():
+            legacy_file.unlink()
+            parser_cache.invalidate(legacy_file)
+            return legacy_file
+        return None
+
+    def migrate(self) -> None:
+        """One-time conversion of legacy YAML host files to the JSON format."""
+        if SERIALIZER == "yaml":
+            return
+
+        for yml_file in list(self.repo.repo_path.glob("*.yml")):
+            json_file = yml_file.with_suffix(".json")
+            if json_file.exists():
+                continue
+            data = parser_cache.load(yml_file)
+            with open(json_file, "wb") as f:
+                f.write(self._dump_bytes(data))
+            yml_file.unlink()
+            parser_cache.invalidate(yml_file)
+            self.repo.mark_dirty()
+
+        self.repo.commit_and_push_all("Migrate hostvars to JSON")
+
+    def _sync_repo_dir(self) -> None:
+        """Flush directory metadata once per batch of hostvars writes."""
+        dir_fd = os.open(self.repo.repo_path, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+    def bulk_update(self, host: str, changes: list, commit_msg: str = "Update hostvars") -> None:
+        """
+        Apply several (var_type, replace_type, data) changes for a host with a
+        single load and a single save/commit instead of one round-trip each.
+        """
+        hostvars = self.load(force_pull=True)
+        # load() hands back the parser cache's own dicts; copy the target
+        # host's data before the merges below mutate it (same aliasing hazard
+        # as update_one).
+        if host in hostvars.data:
+            hostvars.data[host] = copy.deepcopy(hostvars.data[host])
+        for var_type, replace_type, new_data in changes:
+            hostvars.update(host, var_type, replace_type, new_data)
+        self.save(hostvars, commit_msg)
+
     def create(self, host: str, storage: StorageModel, system: SystemModel) -> None:
         """Create a new hostvars file for a given host."""
-        hostvar_file = self.repo.repo_path / f"{host}.yml"
-        if hostvar_file.exists():
+        with self.repo.lock:
+            self._create_locked(host, storage, system)
+
+    def _create_locked(self, host: str, storage: StorageModel, system: SystemModel) -> None:
+        if self._find_host_file(host) is not None:
             logger.warning(f"Hostvars file for '{host}' already exists.")
             return
 
         # Initialize state with all fields
-        self.update(host, HostvarType.SYSTEM, ReplacementType.OVERRIDE, system.model_dump(), batch_updates=True)
-        self.update(host, HostvarType.STATE, ReplacementType.OVERRIDE, StateModel().model_dump(), batch_updates=True)
-        self.update(host, HostvarType.STORAGE, ReplacementType.OVERRIDE, storage.model_dump(), commit_msg="Create data", batch_updates=False)
+        data = {
+            HostvarType.SYSTEM.value: system.model_dump(),
+            HostvarType.STATE.value: StateModel.model_construct().model_dump(),
+            HostvarType.STORAGE.value: storage.model_dump(),
+        }
+        hostvar_file = self._host_file(host)
+        payload = self._dump_bytes(data)
+        atomic_write(hostvar_file, payload)
+        self._content_hash[host] = zlib.crc32(payload)
+        parser_cache.invalidate(hostvar_file)
+        self._sync_repo_dir()
+        self.repo.mark_dirty()
+        self.repo.commit_and_push_all("Create data")
 
     def delete(self, host: str) -> None:
         """Delete the hostvars file for a given host."""
-        hostvar_file = self.repo.repo_path / f"{host}.yml"
-        if not hostvar_file.exists():
+        with self.repo.lock:
+            self._delete_locked(host)
+
+    def _delete_locked(self, host: str) -> None:
+        hostvar_file = self._find_host_file(host)
+        if hostvar_file is None:
             logger.warning(f"Hostvars file for '{host}' does not exist.")
             return
 
         try:
             hostvar_file.unlink()
+            parser_cache.invalidate(hostvar_file)
+            self._content_hash.pop(host, None)
+            self.repo.mark_dirty()
             logger.debug(f"Deleted hostvars file for '{host}'.")
         except Exception as e:
             logger.error(f"Error deleting {hostvar_file}: {e}")
@@ -141,22 +327,64 @@ class HostvarsManager(AnsibleManager):
 
         self.repo.commit_and_push_all("Delete hostvars")
 
-    def update(self, host: str, var_type: HostvarType, replace_type: ReplacementType, new_data: dict, commit_msg:str = "Update hostvars", batch_updates: bool = False) -> None:
+    def update_one(self, host: str, var_type: HostvarType, replace_type: ReplacementType, new_data: dict, commit_msg: str = "Update hostvars", batch_updates: bool = False) -> None:
         """
-        Reload the latest hostvars, update the data, and then save.
-        This minimizes the risk of working with outdated data.
+        Single-host fast path: pull, read, mutate, and atomically rewrite only
+        this host's file, then commit just that path. Avoids the O(N) reload
+        and rewrite of every other host.
         """
-        # Refresh data
-        logger.info(f"Update params: host={host}, var_type={var_type}, new_data={new_data}")
-        hostvars = self.load()
+        with self.repo.lock:
+            self._update_one_locked(host, var_type, replace_type, new_data, commit_msg, batch_updates)
+
+    def _update_one_locked(self, host, var_type, replace_type, new_data, commit_msg, batch_updates):
+        self.repo.pull(force=True)
+
+        data = {}
+        hostvar_file = self._find_host_file(host)
+        if hostvar_file is not None:
+            try:
+                # Deep-copy so the merge below never mutates the cache's own
+                # object: a failed write would otherwise leave unpersisted data
+                # in the cache, and concurrent reads could see a half-merge.
+                data = copy.deepcopy(parser_cache.load(hostvar_file))
+            except (yaml.YAMLError, orjson.JSONDecodeError) as e:
+                logger.error(f"Error loading {hostvar_file}: {e}")
+
+        hostvars = Hostvars({host: data})
         try:
             hostvars.update(host, var_type, replace_type, new_data)
         except Exception as e:
             logger.error(f"Failed to update hostvars for '{host}': {e}")
             raise
 
-        # Save updated hostvars
-        self.save(hostvars, commit_msg, batch_updates)
+        out_file = self._host_file(host)
+        payload = self._dump_bytes(hostvars.data.get(host, {}))
+        digest = zlib.crc32(payload)
+        if self._content_hash.get(host) == digest and out_file.exists():
+            logger.debug(f"Hostvars for '{host}' unchanged; skipping write.")
+            return
+
+        atomic_write(out_file, payload)
+        self._content_hash[host] = digest
+        parser_cache.invalidate(out_file)
+        legacy_file = self._remove_legacy_file(host, out_file)
+        self._sync_repo_dir()
+        self.repo.mark_dirty()
+
+        if batch_updates:
+            return
+
+        paths = [out_file] if legacy_file is None else [out_file, legacy_file]
+        self.repo.commit_and_push_paths(paths, commit_msg)
+
+    def update(self, host: str, var_type: HostvarType, replace_type: ReplacementType, new_data: dict, commit_msg:str = "Update hostvars", batch_updates: bool = False) -> None:
+        """
+        Update hostvars for a single host. Delegates to the single-file fast
+        path; bulk_update remains the full load/save route for multi-change
+        operations.
+        """
+        logger.info("Update params: host=%s, var_type=%s, new_data=%s", host, var_type, new_data)
+        self.update_one(host, var_type, replace_type, new_data, commit_msg, batch_updates)
 
     def get(self, host: str) -> dict:
         """Reload and return hostvars for a specific host."""
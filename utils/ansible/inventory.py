@@ -1,21 +1,28 @@
 import yaml
-import json
 import logging
+import mmap
+import orjson
+import os
+import threading
+
 from pathlib import Path
 
 from ansible.inventory.manager import InventoryManager as AnsibleInventoryManager
 from ansible.parsing.dataloader import DataLoader
 
 from utils.ansible.manager import AnsibleManager, AnsibleObject
+from utils.file_utils import atomic_write
 from utils.repo import RepoManager
+from utils.yaml_compat import SafeLoader, SafeDumper
 
 
 logger = logging.getLogger(__name__)
 
-yaml.SafeDumper.add_representer(
-    type(None),
-    lambda dumper, value: dumper.represent_scalar(u'tag:yaml.org,2002:null', '')
-)
+"""Separator characters stripped when normalizing MAC addresses for lookup"""
+_MAC_SEPARATORS = str.maketrans('', '', ':-.')
+
+def _norm_mac(mac: str) -> str:
+    return mac.translate(_MAC_SEPARATORS).lower()
 
 class Inventory(AnsibleObject):
     """
@@ -39,7 +46,7 @@ class Inventory(AnsibleObject):
         self.inventory.refresh_inventory()
         self.inventory.add_group('all')
 
-        if host_name in [h.name for h in self.inventory.get_hosts()]:
+        if self.inventory.get_host(host_name) is not None:
             raise ValueError(f"Host '{host_name}' already exists.")
 
         # Add host to the default 'all' group.
@@ -75,11 +82,11 @@ class Inventory(AnsibleObject):
 
         self.inventory._inventory.remove_host(host)
 
+        groups_dict = self.inventory.get_groups_dict()
         for group in self.inventory.groups:
-            logger.info(f"Group: {group}")
-            logger.info(f"Hosts: {self.inventory.get_groups_dict()[group]}")
+            logger.debug("Group %s hosts: %s", group, groups_dict.get(group, ()))
 
-        groups_to_remove = [group for group in self.inventory.groups if not self.inventory.get_groups_dict()[group]]
+        groups_to_remove = [group for group in self.inventory.groups if not groups_dict.get(group)]
         for group in groups_to_remove:
             self.inventory._inventory.remove_group(group)
 
@@ -112,27 +119,28 @@ class Inventory(AnsibleObject):
         """
         logger.info(f"Existing hosts: {self.inventory.get_hosts()}")
 
-        inventory_dict = {"all": {"hosts": {}, "children": {}}}
         groups_dict = self.inventory.get_groups_dict()
+        get_host = self.inventory.get_host
 
         # Populate the 'hosts' section from the "all" group.
-        for host in groups_dict.get("all", []):
-            host_entry = self.inventory.get_host(host)
-            if host_entry:
-                hostvars = host_entry.vars.copy()
-                hostvars.pop("inventory_file", None)
-                hostvars.pop("inventory_dir", None)
-                inventory_dict["all"]["hosts"][host] = hostvars
+        hosts_section = {}
+        for host in groups_dict.get("all", ()):
+            host_entry = get_host(host)
+            if host_entry is None:
+                continue
+            hosts_section[host] = {
+                k: v for k, v in host_entry.vars.items()
+                if k not in ("inventory_file", "inventory_dir")
+            }
 
         # Populate the 'children' groups.
-        for group, hosts in groups_dict.items():
-            if group in ["all", "ungrouped"]:
-                continue
-            inventory_dict["all"]["children"][group] = {"hosts": {}}
-            for host in hosts:
-                inventory_dict["all"]["children"][group]["hosts"][host] = None
+        children_section = {
+            group: {"hosts": {host: None for host in hosts}}
+            for group, hosts in groups_dict.items()
+            if group not in ("all", "ungrouped")
+        }
 
-        return inventory_dict
+        return {"all": {"hosts": hosts_section, "children": children_section}}
 
 
 class InventoryManager(AnsibleManager):
@@ -144,13 +152,57 @@ class InventoryManager(AnsibleManager):
     def __init__(self, repo: RepoManager):
         super().__init__(repo)
         self.inventory_file = self.repo.repo_path / "inventory.yml"
+        self._raw_data = None
+        self._raw_mtime_ns = 0
+        self._by_mac = None
+        self._inventory = None
+        self._inventory_mtime = 0
+        self._lock = threading.Lock()
+
+    def load_raw(self) -> dict:
+        """
+        Return the parsed inventory.yml as a plain dict without building the
+        Ansible inventory. The file is mmap-read and only re-parsed when its
+        mtime changes, so read-only callers skip the parse entirely.
+        """
+        self.repo.pull()
+        try:
+            st = self.inventory_file.stat()
+        except FileNotFoundError:
+            # No inventory.yml yet (empty repo): same as an empty inventory.
+            return {}
+        if self._raw_data is not None and st.st_mtime_ns == self._raw_mtime_ns:
+            return self._raw_data
+
+        if st.st_size == 0:
+            self._raw_data = {}
+        else:
+            with open(self.inventory_file, "rb") as f:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    self._raw_data = yaml.load(mm, Loader=SafeLoader) or {}
+
+        self._raw_mtime_ns = st.st_mtime_ns
+        return self._raw_data
 
     def load(self) -> Inventory:
         """
-        Pull the latest repository data and instantiate the Inventory domain model.
+        Pull the latest repository data and return the Inventory domain model,
+        reusing the cached instance while inventory.yml is unchanged on disk.
         """
         self.repo.pull()
-        inventory = Inventory(inventory_file=self.inventory_file)
+        try:
+            mtime = self.inventory_file.stat().st_mtime_ns
+        except FileNotFoundError:
+            # Fresh clone without an inventory.yml yet: Ansible just warns on
+            # the missing source, and the first save() will create the file.
+            # Skip the cache so that save is what populates it.
+            return Inventory(inventory_file=self.inventory_file)
+        with self._lock:
+            if self._inventory is not None and mtime == self._inventory_mtime:
+                return self._inventory
+            inventory = Inventory(inventory_file=self.inventory_file)
+            self._inventory = inventory
+            self._inventory_mtime = mtime
         logger.debug("Inventory loaded via internal Ansible InventoryManager.")
         return inventory
 
@@ -159,11 +211,23 @@ class InventoryManager(AnsibleManager):
         Save the Inventory domain model by converting it to a dictionary, writing it
         to the YAML file, and then committing/pushing changes via the repository.
         """
+        with self.repo.lock:
+            self._save_locked(inventory)
+
+    def _save_locked(self, inventory: Inventory) -> None:
         inventory_dict = inventory.to_dict()
-        json_data = json.loads(json.dumps(inventory_dict))
+        # OPT_NON_STR_KEYS: to_dict() keys are AnsibleUnicode (a str subclass),
+        # which orjson rejects by default; default= is never consulted for keys.
+        json_data = orjson.loads(
+            orjson.dumps(inventory_dict, option=orjson.OPT_NON_STR_KEYS, default=str)
+        )
         logger.info(f"Inventory: {json_data}")
-        with open(self.inventory_file, "w") as f:
-            yaml.safe_dump(json_data, f, default_flow_style=False)
+        atomic_write(self.inventory_file, yaml.dump(json_data, Dumper=SafeDumper, default_flow_style=False).encode())
+        self._raw_data = None
+        self._by_mac = None
+        with self._lock:
+            self._inventory = None
+        self.repo.mark_dirty()
         self.repo.commit_and_push_all("Update inventory")
         logger.info("Inventory saved and changes pushed.")
 
@@ -172,51 +236,57 @@ class InventoryManager(AnsibleManager):
         Load the current inventory, delegate the host addition to the domain model,
         and save the updated inventory.
         """
-        inventory = self.load()
-        try:
-            inventory.add_host(host_name, groups, family, ip, mac, port, ansible_user)
-            logger.info(f"Host '{host_name}' added successfully.")
-        except ValueError as e:
-            logger.warning(e)
-            return
+        with self.repo.lock:
+            inventory = self.load()
+            try:
+                inventory.add_host(host_name, groups, family, ip, mac, port, ansible_user)
+                logger.info(f"Host '{host_name}' added successfully.")
+            except ValueError as e:
+                logger.warning(e)
+                return
 
-        self.save(inventory)
+            self.save(inventory)
 
     def remove_host(self, host_name: str) -> None:
         """
         Load the current inventory, delegate the host removal to the domain model,
         and save the updated inventory.
         """
-        inventory = self.load()
-        try:
-            inventory.remove_host(host_name)
-            logger.info(f"Host '{host_name}' removed successfully.")
-        except ValueError as e:
-            logger.warning(e)
-            return
-        self.save(inventory)
+        with self.repo.lock:
+            inventory = self.load()
+            try:
+                inventory.remove_host(host_name)
+                logger.info(f"Host '{host_name}' removed successfully.")
+            except ValueError as e:
+                logger.warning(e)
+                return
+            self.save(inventory)
 
     def update_host_vars(self, host_name: str, new_vars: dict) -> None:
         """
         Load the current inventory, delegate the host variable update to the domain model,
         and save the updated inventory.
         """
-        inventory = self.load()
-        try:
-            inventory.update_host_vars(host_name, new_vars)
-            logger.info(f"Host variables for '{host_name}' updated successfully.")
-        except ValueError as e:
-            logger.warning(e)
-            return
-        self.save(inventory)
+        with self.repo.lock:
+            inventory = self.load()
+            try:
+                inventory.update_host_vars(host_name, new_vars)
+                logger.info(f"Host variables for '{host_name}' updated successfully.")
+            except ValueError as e:
+                logger.warning(e)
+                return
+            self.save(inventory)
 
     def get_host_by_mac(self, mac: str) -> str:
         """
-        Load the current inventory and return the host name associated with the given MAC address.
+        Return the host associated with the given MAC address. Lookups hit a
+        normalized mac -> host index that is rebuilt only after mutations.
         """
-        inventory = self.load()
-        inventory.inventory.refresh_inventory()
-        for host in inventory.inventory.get_hosts():
-            if host.vars.get("primary_mac") == mac:
-                return host
-        return None
+        if self._by_mac is None:
+            inventory = self.load()
+            self._by_mac = {}
+            for host in inventory.inventory.get_hosts():
+                host_mac = host.vars.get("primary_mac")
+                if host_mac:
+                    self._by_mac[_norm_mac(str(host_mac))] = host
+        return self._by_mac.get(_norm_mac(mac))
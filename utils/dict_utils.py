@@ -6,13 +6,19 @@ class ReplacementType(Enum):
     OVERRIDE = "override"
 
 def deep_merge(d1: dict, d2: dict):
-    for k, v in d2.items():
-        if isinstance(v, dict):
-            if not isinstance(d1.get(k), dict):
-                d1[k] = {}
+    if not d1:
+        d1.update(d2)
+        return d1
 
-            deep_merge(d1[k], v)
-        else:
-            d1[k] = v
+    stack = [(d1, d2)]
+    while stack:
+        dst, src = stack.pop()
+        for k, v in src.items():
+            if v.__class__ is dict:
+                cur = dst.get(k)
+                if cur.__class__ is dict:
+                    stack.append((cur, v))
+                    continue
+            dst[k] = v
 
     return d1
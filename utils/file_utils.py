@@ -0,0 +1,30 @@
+import os
+from pathlib import Path
+
+
+def atomic_write(path: Path, data: bytes) -> None:
+    """
+    Crash-safe file replacement: write the full payload to an exclusive temp
+    file, fsync it, then rename over the target so readers never observe a
+    truncated file.
+    """
+    tmp_path = f"{path}.tmp"
+    try:
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+    except FileExistsError:
+        # Leftover from an earlier crash; the rename never happened, so it is
+        # safe to discard.
+        os.unlink(tmp_path)
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+
+    try:
+        os.write(fd, data)
+        os.fsync(fd)
+    except Exception:
+        os.close(fd)
+        os.unlink(tmp_path)
+        raise
+    else:
+        os.close(fd)
+
+    os.replace(tmp_path, path)
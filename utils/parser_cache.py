@@ -0,0 +1,58 @@
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import orjson
+import yaml
+
+from utils.yaml_compat import SafeLoader
+
+logger = logging.getLogger(__name__)
+
+
+class ParserCache:
+    """
+    LRU cache for parsed YAML/JSON documents.
+    Entries are keyed on (path, mtime_ns, size) so any write to the file
+    naturally invalidates the old entry; cache hits skip the YAML parse entirely.
+    """
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple, dict] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def load(self, path: Path) -> dict:
+        st = path.stat()
+        key = (str(path), st.st_mtime_ns, st.st_size)
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                self._entries.move_to_end(key)
+                return cached
+
+        if path.suffix == ".json":
+            with open(path, "rb", buffering=1024 * 1024) as f:
+                raw = f.read()
+            data = orjson.loads(raw) if raw else {}
+        else:
+            with open(path, "r", buffering=1024 * 1024) as f:
+                data = yaml.load(f, Loader=SafeLoader) or {}
+
+        with self._lock:
+            self._entries[key] = data
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+        return data
+
+    def invalidate(self, path: Path) -> None:
+        """Drop all cached entries for a file (used by write paths)."""
+        spath = str(path)
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == spath]:
+                del self._entries[key]
+
+
+"""Shared cache instance used by the YAML-backed managers."""
+parser_cache = ParserCache()
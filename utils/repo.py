@@ -1,62 +1,187 @@
+import functools
+import threading
+import time
 import yaml
 import logging
 from pathlib import Path
 from git import Repo
 from returns.result import Failure, Result, Success
 
-logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
+from utils.yaml_compat import SafeDumper
+
 logger = logging.getLogger(__name__)
 
 
-# Data manipulation => Hostvars class
-# Reading/writing to/from files 
-# Cloning/pulling/pushing to/from git repos
+_OPEN_REPOS: list[Repo] = []
+
+@functools.lru_cache(maxsize=32)
+def _open_or_clone(ssh_url: str, repo_path_str: str) -> Repo:
+    """
+    Open (or clone) the repository at repo_path once per process. Repeated
+    RepoManager construction for the same repo reuses the cached handle
+    instead of re-running git discovery and spawning new processes.
+    """
+    repo_path = Path(repo_path_str)
+    repo = Repo(repo_path) if repo_path.exists() else Repo.clone_from(ssh_url, repo_path)
+    _OPEN_REPOS.append(repo)
+    return repo
 
 
 class RepoManager:
-    def __init__(self, ssh_url: str, repo_path: Path):
+    def __init__(self, ssh_url: str, repo_path: Path, pull_ttl: float = 30.0):
         self.ssh_url = ssh_url
         self.repo_path = repo_path
         self.repo = self.clone_repo(ssh_url, repo_path)
+        self.defer_push = False
+        self.pull_ttl = pull_ttl
+        self._pending_msgs: list[str] = []
+        self._origin = None
+        self._dirty = False
+        self._last_pull = 0.0
+        # Serializes pull/write/commit across the git thread pool: the index,
+        # worktree, and dirty bookkeeping are not safe under concurrent use.
+        self.lock = threading.RLock()
 
     @staticmethod
-    def clone_repo(ssh_url: str, repo_path: Path) -> Repo:
-        try:
-            if repo_path.exists():
-                return Repo(repo_path)
-            return Repo.clone_from(ssh_url, repo_path)
-        except Exception as e:
-            logger.error(f"Failed to clone repo: {e}")
-            exit(1)
+    def clone_repo(ssh_url: str, repo_path: Path, attempts: int = 3) -> Repo:
+        """
+        Open or clone the repository, retrying transient failures with
+        exponential backoff. Raises after the final attempt so callers can
+        handle the error instead of the process being killed.
+        """
+        for attempt in range(attempts):
+            try:
+                return _open_or_clone(ssh_url, str(repo_path))
+            except Exception as e:
+                if attempt == attempts - 1:
+                    logger.error(f"Failed to clone repo: {e}")
+                    raise
+                delay = 0.5 * (2 ** attempt)
+                logger.warning(f"Clone attempt {attempt + 1} failed ({e}); retrying in {delay}s")
+                time.sleep(delay)
+
+    @classmethod
+    def close_all(cls) -> None:
+        """Close every cached repo handle and drop the cache (shutdown hook)."""
+        while _OPEN_REPOS:
+            _OPEN_REPOS.pop().close()
+        _open_or_clone.cache_clear()
 
     def is_file_exists(self, file_path: Path) -> bool:
         return file_path.exists()
 
-    def pull(self) -> Result[None, str]:
-        try:
-            self.repo.remotes.origin.pull()
-            logger.info("Pulled changes")
-            return Success(None)
-        except Exception as e:
-            return Failure("Failed to pull changes")
+    @property
+    def origin(self):
+        """Resolve the origin remote once and reuse the handle."""
+        if self._origin is None:
+            self._origin = self.repo.remotes.origin
+        return self._origin
+
+    def mark_dirty(self) -> None:
+        """Record that the working tree was mutated since the last push."""
+        self._dirty = True
+
+    def pull(self, force: bool = False) -> Result[None, str]:
+        """
+        Pull from origin, skipping the network round-trip when the last
+        successful pull is younger than pull_ttl. Callers that must see the
+        freshest remote state (e.g. before a mutation) pass force=True.
+        """
+        with self.lock:
+            if not force and time.monotonic() - self._last_pull < self.pull_ttl:
+                return Success(None)
+
+            try:
+                self.origin.pull()
+                self._last_pull = time.monotonic()
+                logger.info("Pulled changes")
+                return Success(None)
+            except Exception as e:
+                return Failure("Failed to pull changes")
 
     def commit_and_push_all(self, commit_msg: str) -> Result[None, str]:
+        with self.lock:
+            if self.defer_push:
+                self._pending_msgs.append(commit_msg)
+                return Success(None)
+            return self._commit_and_push(commit_msg)
+
+    def flush(self) -> Result[None, str]:
+        """Coalesce all deferred commits into a single commit and push."""
+        with self.lock:
+            if not self._pending_msgs:
+                return Success(None)
+
+            msgs, self._pending_msgs = self._pending_msgs, []
+            result = self._commit_and_push("; ".join(dict.fromkeys(msgs)))
+            if isinstance(result, Failure):
+                # Requeue so the next flush (and the sync fence) retries
+                # instead of stranding uncommitted local changes.
+                self._pending_msgs = msgs + self._pending_msgs
+            return result
+
+    def commit_and_push_paths(self, paths: list, commit_msg: str) -> Result[None, str]:
+        """Stage, commit, and push only the given paths."""
+        with self.lock:
+            if self.defer_push:
+                self._pending_msgs.append(commit_msg)
+                return Success(None)
+
+            try:
+                # git add (unlike IndexFile.add) also stages deleted paths.
+                self.repo.git.add([str(p) for p in paths])
+                self.repo.index.commit(commit_msg)
+                self.origin.push()
+                return Success(None)
+            except Exception as e:
+                return Failure("Failed to commit or push changes")
+
+    def _commit_and_push(self, commit_msg: str) -> Result[None, str]:
+        with self.lock:
+            return self._commit_and_push_locked(commit_msg)
+
+    def _commit_and_push_locked(self, commit_msg: str) -> Result[None, str]:
         try:
+            if not self._dirty:
+                logger.info("No changes to commit")
+                return Success(None)
+
             self.repo.git.add(".")
-            if self.repo.is_dirty(untracked_files=True):
-                self.repo.index.commit(commit_msg)
-                self.repo.remotes.origin.push()
-            else:
+            # Diffing the index against HEAD is a tree compare (no worktree
+            # walk) and catches writes that ended up byte-identical, so we
+            # never record an empty commit. An unborn HEAD always commits.
+            if self.repo.head.is_valid() and not self.repo.index.diff("HEAD"):
                 logger.info("No changes to commit")
+                self._dirty = False
+                return Success(None)
 
+            self.repo.index.commit(commit_msg)
+            self.origin.push()
+            self._dirty = False
             return Success(None)
         except Exception as e:
             return Failure("Failed to commit or push changes")
 
+    def write_files_and_commit(self, files: list, commit_msg: str) -> Result[None, str]:
+        """
+        Write several (file_path, data) pairs and record them as a single
+        commit, instead of one write/commit/push round-trip per file.
+        """
+        with self.lock:
+            for file_path, data in files:
+                result = self.write_file(file_path, data)
+                if isinstance(result, Failure):
+                    return result
+
+            return self.commit_and_push_paths([file_path for file_path, _ in files], commit_msg)
+
     def write_file(self, file_path: Path, data: dict) -> Result[None, str]:
-        try:
-            with open(file_path, "w") as f:
-                yaml.safe_dump(data, f)
-            return Success(None)
-        except Exception as e:
-            return Failure(f"Failed to write file: {e}")
+        with self.lock:
+            try:
+                with open(file_path, "wb", buffering=1 << 20) as f:
+                    yaml.dump(data, f, Dumper=SafeDumper, encoding="utf-8",
+                              default_flow_style=False, sort_keys=False)
+                self._dirty = True
+                return Success(None)
+            except Exception as e:
+                return Failure(f"Failed to write file: {e}")
@@ -30,6 +30,17 @@ class TestDeepMerge(unittest.TestCase):
         result = deep_merge(d1, d2)
         expected = {"a": 1}
         self.assertEqual(result, expected)
+        # Contract: the merge is in-place and returns d1, so the empty-side
+        # fast path may not hand back d2 directly.
+        self.assertIs(result, d1)
+
+    def test_deep_merge_empty_source(self):
+        d1 = {"a": 1, "b": {"c": 2}}
+        d2 = {}
+        result = deep_merge(d1, d2)
+        expected = {"a": 1, "b": {"c": 2}}
+        self.assertEqual(result, expected)
+        self.assertIs(result, d1)
 
     def test_deep_merge_both_empty(self):
         d1 = {}
@@ -37,6 +48,7 @@ class TestDeepMerge(unittest.TestCase):
         result = deep_merge(d1, d2)
         expected = {}
         self.assertEqual(result, expected)
+        self.assertIs(result, d1)
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,19 @@
+"""
+Shared libyaml-backed loader/dumper aliases.
+
+PyYAML's safe_load/safe_dump default to the pure-Python implementation;
+importing SafeLoader/SafeDumper from here picks up the C classes when PyYAML
+was built against libyaml and silently falls back to the pure-Python ones
+otherwise. The None representer lives here too since every dumper in this
+codebase is expected to emit nulls as empty scalars (inventory-file style).
+"""
+
+try:
+    from yaml import CSafeLoader as SafeLoader, CSafeDumper as SafeDumper
+except ImportError:
+    from yaml import SafeLoader, SafeDumper
+
+SafeDumper.add_representer(
+    type(None),
+    lambda dumper, value: dumper.represent_scalar(u'tag:yaml.org,2002:null', '')
+)